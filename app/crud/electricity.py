@@ -1,10 +1,48 @@
-from datetime import datetime, timedelta
-from typing import List
+import logging
+import time
+from datetime import datetime, timezone
+from typing import List, Set, Tuple
+from weakref import WeakKeyDictionary
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
 
 from app.utils import external
 from app import models
 
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement, keeps the bound parameters below SQLite's 999 variable limit
+INSERT_BATCH_SIZE = 400
+
+HOUR_SECONDS = 3600
+
+# Seconds an engine's known stored hours are trusted before they are checked again, so rows
+# deleted to force a refetch are picked up without restarting the process
+STORED_HOURS_TTL = 15 * 60
+
+# Hours (epoch seconds) known to be stored, per engine, with the monotonic time they expire.
+# This relies on ElectricityPrice rows being insert-only.
+_stored_hours: "WeakKeyDictionary[Engine, Tuple[float, Set[int]]]" = WeakKeyDictionary()
+
+
+def _get_stored_hours(db: Session) -> Set[int]:
+    """Hours known to be stored in the session's database, starting empty once they expire."""
+    bind = db.get_bind()
+    now = time.monotonic()
+    entry = _stored_hours.get(bind)
+    if entry is None or entry[0] <= now:
+        entry = (now + STORED_HOURS_TTL, set())
+        _stored_hours[bind] = entry
+    return entry[1]
+
+
+def reset_stored_hours() -> None:
+    """Forget every known stored hour, e.g. after rows were deleted or the database replaced."""
+    _stored_hours.clear()
+
+
 def get_electricity_prices(
     db: Session, start_date: datetime, end_date: datetime
 ) -> List[models.ElectricityPrice]:
@@ -21,52 +59,86 @@ def get_electricity_prices(
     start_date = start_date.replace(minute=0, second=0, microsecond=0)
     end_date = end_date.replace(minute=0, second=0, microsecond=0)
 
-    # Query existing prices from database
-    prices = (
-        db.query(models.ElectricityPrice)
-        .filter(
-            models.ElectricityPrice.timestamp >= start_date,
-            models.ElectricityPrice.timestamp <= end_date,
-        )
-        .all()
+    in_range = (
+        models.ElectricityPrice.timestamp >= start_date,
+        models.ElectricityPrice.timestamp <= end_date,
     )
 
-    # Find missing hours
-    existing_timestamps = set(price.timestamp for price in prices)
-    all_hours = {
-        start_date + timedelta(hours=i)
-        for i in range(int((end_date - start_date).total_seconds() // 3600) + 1)
+    # Find missing hours, compared as epoch seconds which are much cheaper to hash than datetimes
+    stored_hours = _get_stored_hours(db)
+    start_ts = int(start_date.timestamp())
+    end_ts = int(end_date.timestamp())
+    expected_hours = range(start_ts, end_ts + 1, HOUR_SECONDS)
+    # Hours past the publication horizon are neither stored nor available upstream yet
+    published_until_ts = int(external.get_published_until().timestamp())
+    missing_hours = {
+        ts for ts in expected_hours
+        if ts not in stored_hours and ts < published_until_ts
     }
-    missing_hours = all_hours - existing_timestamps
 
-    if not missing_hours:
-        all_prices = prices
-    else:
+    if missing_hours:
+        first_ts, last_ts = min(missing_hours), max(missing_hours)
+        in_missing_span = (
+            models.ElectricityPrice.timestamp >= datetime.fromtimestamp(first_ts, tz=timezone.utc),
+            models.ElectricityPrice.timestamp <= datetime.fromtimestamp(last_ts, tz=timezone.utc),
+        )
+        span_hours = range(first_ts, last_ts + 1, HOUR_SECONDS)
+
+        # A single aggregate tells whether the whole span is already stored
+        stored_count = (
+            db.query(func.count(models.ElectricityPrice.timestamp))
+            .filter(*in_missing_span)
+            .scalar()
+        )
+        if stored_count == len(span_hours):
+            stored_hours.update(span_hours)
+        else:
+            # Check which of the unknown hours are already stored, loading only the timestamp column
+            stored = (
+                db.query(models.ElectricityPrice.timestamp)
+                .filter(*in_missing_span)
+                .yield_per(1000)
+            )
+            stored_hours.update(int(timestamp.timestamp()) for (timestamp,) in stored)
+        # Filter by membership, an in-place difference would walk every stored hour
+        missing_hours = {ts for ts in missing_hours if ts not in stored_hours}
+
+    if missing_hours:
         try:
-            # Fetch missing data from ENTSO-E API
-            new_prices = external.get_electricity_price(
-                min(missing_hours), max(missing_hours) + timedelta(hours=1)
+            # Fetch missing data from ENTSO-E API as plain rows, ready for the bulk insert
+            rows = external.get_electricity_price_data(
+                datetime.fromtimestamp(min(missing_hours), tz=timezone.utc),
+                datetime.fromtimestamp(max(missing_hours) + HOUR_SECONDS, tz=timezone.utc),
             )
 
             # Filter out prices that were outside wanted range
-            new_prices = [price for price in new_prices if price.timestamp in missing_hours]
+            rows = [
+                row for row in rows
+                if int(row["timestamp"].timestamp()) in missing_hours
+            ]
 
-            # Add new prices to the database
-            if new_prices:
-                for new_price in new_prices:
-                    db.add(new_price)
+            # Add new prices to the database in batches, skipping rows that already exist
+            if rows:
+                # Insert against the table itself so the statements skip ORM execution bookkeeping
+                insert_stmt = sqlite_insert(models.ElectricityPrice.__table__).on_conflict_do_nothing(
+                    index_elements=["timestamp"]
+                )
+                for i in range(0, len(rows), INSERT_BATCH_SIZE):
+                    db.execute(insert_stmt.values(rows[i:i + INSERT_BATCH_SIZE]))
                 db.commit()
-
-            # Merge existing and new prices
-            all_prices = prices + new_prices
-            all_prices.sort(key=lambda x: x.timestamp)
+                stored_hours.update(int(row["timestamp"].timestamp()) for row in rows)
         except Exception as e:
-            db.rollback()
             # If external API fails, return what we have from the database
-            all_prices = prices
-            all_prices.sort(key=lambda x: x.timestamp)
+            logger.error("Failed to fetch missing electricity prices: %s", e)
+            db.rollback()
 
-    return all_prices
+    # Load the full rows once the range is as complete as it can be, sorted by the primary key index
+    return (
+        db.query(models.ElectricityPrice)
+        .filter(*in_range)
+        .order_by(models.ElectricityPrice.timestamp)
+        .all()
+    )
 
 # Optional: Keep the service class for future use
 class ElectricityPriceService:
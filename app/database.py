@@ -1,7 +1,8 @@
 from typing import Generator
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 from pathlib import Path
 
 # Ensure data directory exists
@@ -9,12 +10,43 @@ Path("./data").mkdir(exist_ok=True)
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./data/electricity_prices.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},  # SQLite specific
-    pool_pre_ping=True,  # Enable connection health checks
-    pool_recycle=3600,   # Recycle connections every hour
-)
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+# Sized for FastAPI's threadpool (40 workers) running the sync endpoints
+POOL_OPTIONS = {
+    "pool_size": 20,
+    "max_overflow": 20,
+    "pool_timeout": 5,  # Fail fast instead of queueing requests for 30s
+    "pool_pre_ping": True,  # Enable connection health checks
+    "pool_recycle": 3600,  # Recycle connections every hour
+}
+
+if IS_SQLITE:
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,  # Keep connections open, WAL allows concurrent readers
+        **POOL_OPTIONS,
+    )
+else:
+    # Server databases (e.g. PostgreSQL) use their dialect's default QueuePool
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, **POOL_OPTIONS)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Configure every new SQLite connection for concurrent reads and cheap commits."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, no fsync per commit
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+if IS_SQLITE:
+    event.listen(engine, "connect", set_sqlite_pragmas)
 
 # Create session factory
 SessionLocal = sessionmaker(
@@ -35,4 +67,9 @@ def get_db() -> Generator[Session, None, None]:
 
 def init_db() -> None:
     """Initialize database and create all tables."""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    # Imported here, the crud module depends on the models which depend on this module
+    from app.crud.electricity import reset_stored_hours
+
+    Base.metadata.create_all(bind=engine)
+    # Forget hours cached as stored, the database file may have been replaced
+    reset_stored_hours()
\ No newline at end of file
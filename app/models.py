@@ -1,13 +1,32 @@
+from bisect import bisect_left
 from datetime import datetime, timedelta, timezone
-from typing import Optional
-import os
-import pytz
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy import Column, Float, case, types
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 from sqlalchemy.ext.hybrid import hybrid_property
 
 from app.database import Base
+from app.utils.date_utils import get_local_timezone
+
+_ZERO = timedelta(0)
+
+
+def _ratio_to_average(price: float, day_average: Optional[float]) -> float:
+    """Ratio of a price to its daily average, 1 if there is no average or it is zero."""
+    if day_average is None or day_average == 0:
+        return 1.0
+    elif day_average < 0:
+        return price / abs(day_average)
+    else:
+        return price / day_average
+
+
+def _day_bounds(timestamp: datetime) -> Tuple[datetime, datetime]:
+    """UTC start and end of the day a timestamp falls on, midnight in the timestamp's own offset."""
+    day_start = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = day_start + timedelta(days=1)
+    return day_start.astimezone(timezone.utc), day_end.astimezone(timezone.utc)
 
 
 class UTCDateTime(types.TypeDecorator):
@@ -23,6 +42,10 @@ class UTCDateTime(types.TypeDecorator):
         if value.tzinfo is None:
             raise ValueError("Naive datetime not allowed. Please provide timezone-aware datetime.")
 
+        # Values are usually UTC already, skip building a converted copy
+        if value.tzinfo is timezone.utc or value.utcoffset() == _ZERO:
+            return value
+
         return value.astimezone(timezone.utc)
 
     def process_result_value(self, value: Optional[datetime], dialect) -> Optional[datetime]:
@@ -32,7 +55,12 @@ class UTCDateTime(types.TypeDecorator):
 
 
 class ElectricityPrice(Base):
-    """Model for storing electricity prices."""
+    """Model for storing electricity prices.
+
+    Rows are insert-only: the app never updates or deletes a stored price. The crud layer
+    relies on this to cache which hours are stored, see crud.electricity.reset_stored_hours
+    when rows are removed by hand.
+    """
 
     __tablename__ = "electricity_prices"
 
@@ -46,38 +74,33 @@ class ElectricityPrice(Base):
         Returns:
             float: Price divided by daily average. Returns 1 if no data or zero average.
         """
-        day_start = self.timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
+        day_start, day_end = _day_bounds(self.timestamp)
+
+        # Averages preloaded for a batch use the same day bounds as the query below
+        day_avg_cache = getattr(self, "_day_avg_cache", None)
+        if day_avg_cache is not None:
+            return _ratio_to_average(self.price, day_avg_cache.get(day_start))
 
         session = Session.object_session(self)
         if session is None:
             return 1.0
 
-        day_prices = (
-            session.query(ElectricityPrice)
+        # Let the database average the day instead of loading every row of it
+        day_average = (
+            session.query(func.avg(ElectricityPrice.price))
             .filter(
-                ElectricityPrice.timestamp >= day_start.astimezone(timezone.utc),
-                ElectricityPrice.timestamp < day_end.astimezone(timezone.utc)
+                ElectricityPrice.timestamp >= day_start,
+                ElectricityPrice.timestamp < day_end
             )
-            .all()
+            .scalar()
         )
 
-        if not day_prices:
-            return 1.0
-
-        day_average = sum(p.price for p in day_prices) / len(day_prices)
-
-        if day_average == 0:
-            return 1.0
-        elif day_average < 0:
-            return self.price / abs(day_average)
-        else:
-            return self.price / day_average
+        return _ratio_to_average(self.price, day_average)
 
     @price_daily_average_ratio.expression
     def price_daily_average_ratio(cls):
         """SQL expression for calculating price_daily_average_ratio."""
-        tz = pytz.timezone(os.getenv("TZ", "UTC"))
+        tz = get_local_timezone()
 
         daily_avg = func.avg(cls.price).over(
             partition_by=func.date_trunc('day', func.timezone(tz.zone, cls.timestamp))
@@ -89,11 +112,74 @@ class ElectricityPrice(Base):
             else_=cls.price / daily_avg
         )
 
+    @classmethod
+    def daily_averages(
+            cls,
+            session: Session,
+            prices: List["ElectricityPrice"]
+    ) -> Dict[datetime, float]:
+        """Fetch the average price of every day covered by the given prices.
+
+        Days are bounded the same way as in price_daily_average_ratio, from midnight in each
+        timestamp's own offset, but all of them are loaded with a single range query.
+
+        Returns:
+            Dict[datetime, float]: Average price keyed by the UTC start of the day.
+        """
+        bounds = {_day_bounds(price.timestamp) for price in prices}
+        range_start = min(day_start for day_start, _ in bounds)
+        range_end = max(day_end for _, day_end in bounds)
+
+        rows = (
+            session.query(cls.timestamp, cls.price)
+            .filter(
+                cls.timestamp >= range_start,
+                cls.timestamp < range_end
+            )
+            .order_by(cls.timestamp)
+            .all()
+        )
+        timestamps = [timestamp for timestamp, _ in rows]
+        day_prices = [price for _, price in rows]
+
+        # Rows are sorted, so each day is a slice found by bisection. Days can overlap
+        # around DST changes, which is why rows are not simply grouped by date.
+        averages: Dict[datetime, float] = {}
+        for day_start, day_end in bounds:
+            first = bisect_left(timestamps, day_start)
+            last = bisect_left(timestamps, day_end)
+            if last > first:
+                averages[day_start] = sum(day_prices[first:last]) / (last - first)
+
+        return averages
+
+    @classmethod
+    def preload_daily_averages(
+            cls,
+            session: Session,
+            prices: List["ElectricityPrice"]
+    ) -> None:
+        """Load the daily averages for a batch of prices with one query.
+
+        The averages are attached to each instance, so reading price_daily_average_ratio
+        afterwards does not query the database per instance.
+        """
+        if not prices:
+            return
+
+        averages = cls.daily_averages(session, prices)
+        for price in prices:
+            price._day_avg_cache = averages
+
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, ElectricityPrice):
             return NotImplemented
         return self.timestamp == other.timestamp
 
+    def __hash__(self) -> int:
+        # Defining __eq__ alone would make instances unhashable
+        return hash(self.timestamp)
+
     def __repr__(self) -> str:
         return (
             f"ElectricityPrice(timestamp={self.timestamp.isoformat()}, "
@@ -1,14 +1,13 @@
-from datetime import datetime
+from datetime import datetime, time, timezone
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-import pytz
 import os
 
 from app import schemas, models
 from app.crud import electricity as crud
 from app.database import get_db
-from app.utils.date_utils import convert_date_tz
+from app.utils.date_utils import convert_date_tz, get_local_timezone
 
 router = APIRouter(
     prefix="/electricity",
@@ -19,7 +18,7 @@ router = APIRouter(
 def convert_to_timezone(prices: List[models.ElectricityPrice]) -> List[models.ElectricityPrice]:
     """Convert prices timestamps to configured timezone."""
     if os.getenv("TZ") != "UTC":
-        tz = pytz.timezone(os.getenv("TZ", "UTC"))
+        tz = get_local_timezone()
         for price in prices:
             price.timestamp = price.timestamp.astimezone(tz)
     return prices
@@ -57,7 +56,7 @@ def get_current_electricity_price(
         db: Session = Depends(get_db),
 ):
     """Fetches the current electricity price."""
-    current_datetime = datetime.now(pytz.utc)
+    current_datetime = datetime.now(timezone.utc)
     normalized_time = current_datetime.replace(minute=0, second=0, microsecond=0)
 
     # Query the database for the current price
@@ -89,18 +88,18 @@ def get_cheapest_hours_today(
         )
 
     # Define the timezone
-    tz = pytz.timezone(os.getenv("TZ", "UTC"))
+    tz = get_local_timezone()
 
     # Fetch the current date in the specified timezone
     current_date = datetime.now(tz).date()
 
     # Define the start and end of the current day in the specified timezone
-    start_of_day = tz.localize(datetime.combine(current_date, datetime.min.time()))
-    end_of_day = tz.localize(datetime.combine(current_date, datetime.max.time()))
+    start_of_day = tz.localize(datetime.combine(current_date, time.min))
+    end_of_day = tz.localize(datetime.combine(current_date, time.max))
 
     # Convert the start and end of the day to UTC
-    start_of_day_utc = start_of_day.astimezone(pytz.utc)
-    end_of_day_utc = end_of_day.astimezone(pytz.utc)
+    start_of_day_utc = start_of_day.astimezone(timezone.utc)
+    end_of_day_utc = end_of_day.astimezone(timezone.utc)
 
     # Query the database for prices within the current day in UTC
     db_prices = crud.get_electricity_prices(db, start_of_day_utc, end_of_day_utc)
@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Dict, List
 from pydantic import BaseModel, ConfigDict, Field, RootModel, validator
+from sqlalchemy.orm import Session
 
 from app.models import ElectricityPrice
 
@@ -48,6 +49,11 @@ class ElectricityPriceResponse(RootModel[Dict[datetime, PriceData]]):
         Returns:
             ElectricityPriceResponse: Response schema instance
         """
+        # Load the daily averages with one query instead of one per model
+        session = Session.object_session(db_models[0]) if db_models else None
+        if session is not None:
+            ElectricityPrice.preload_daily_averages(session, db_models)
+
         data_dict = {
             model.timestamp: PriceData(
                 price=model.price,
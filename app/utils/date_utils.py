@@ -1,8 +1,24 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
 import os
 import pytz
 
 
+@lru_cache(maxsize=8)
+def _get_timezone(name: str) -> pytz.BaseTzInfo:
+    """Returns the pytz timezone with the given name, memoized per name."""
+    return pytz.timezone(name)
+
+
+def get_local_timezone() -> pytz.BaseTzInfo:
+    """
+    Returns the configured local timezone, resolved once per timezone name.
+    Returns:
+        pytz.BaseTzInfo: The timezone named by the TZ environment variable, UTC if not set.
+    """
+    return _get_timezone(os.getenv("TZ", "UTC"))
+
+
 def convert_date_tz(date: datetime) -> datetime:
     """
     Converts a given datetime object to UTC timezone.
@@ -11,9 +27,8 @@ def convert_date_tz(date: datetime) -> datetime:
     Returns:
         datetime: The converted datetime object in UTC timezone.
     """
-    tz_str = os.getenv("TZ", "UTC")
-    tz = pytz.timezone(tz_str)
+    tz = get_local_timezone()
 
     if not date.tzinfo:
         date.replace(tzinfo=tz)
-    return date.astimezone(pytz.utc)
+    return date.astimezone(timezone.utc)
@@ -1,8 +1,10 @@
-from datetime import datetime, timedelta
-import xml.etree.ElementTree as ET
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import io
+from typing import List, Dict, Optional, Tuple
 import os
-import pytz
+import threading
+import time
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -10,6 +12,78 @@ from fastapi import HTTPException
 
 from app.models import ElectricityPrice
 
+try:
+    # libxml2 based parser, much faster than the stdlib one on large responses
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+
+# Qualified XML tag to local name, filled as tags are first seen. ENTSO-E documents only use
+# a few dozen distinct tags, so this replaces splitting the namespace off every element.
+_LOCAL_NAMES: Dict[str, str] = {}
+
+if ET.__name__ == "lxml.etree":
+    _ITERPARSE_OPTIONS = {
+        # Only report the elements the parser reads and skip whitespace-only text nodes
+        "tag": ("{*}position", "{*}price.amount", "{*}start", "{*}Point", "{*}Period", "{*}TimeSeries"),
+        "remove_blank_text": True,
+    }
+else:
+    _ITERPARSE_OPTIONS = {}
+
+_UTC = timezone.utc
+_POINT_SECONDS = 3600  # Day-ahead points are hourly
+
+
+@lru_cache(maxsize=4096)
+def _parse_start(start: Optional[str]) -> Optional[int]:
+    """Parse the start time of a period as epoch seconds, None if it is missing or malformed.
+
+    Responses repeat the same few period starts (one per day), so results are memoized.
+    """
+    # Fast path for the fixed YYYY-MM-DDTHH:MMZ format ENTSO-E uses
+    if start is not None and len(start) == 17 and start[10] == "T" and start[16] == "Z":
+        try:
+            start_dt = datetime(
+                int(start[0:4]), int(start[5:7]), int(start[8:10]),
+                int(start[11:13]), int(start[14:16]),
+                tzinfo=_UTC,
+            )
+        except ValueError:
+            return None
+        return int(start_dt.timestamp())
+
+    try:
+        # fromisoformat only accepts the Z suffix from 3.11
+        start_dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if start_dt.tzinfo is None:
+        return None
+    return int(start_dt.timestamp())
+
+
+@lru_cache(maxsize=1024)
+def _format_timestamp(ts: int) -> str:
+    """Format epoch seconds as YYYYMMDDHHMM in UTC, memoized as callers repeat day boundaries."""
+    return datetime.fromtimestamp(ts, tz=_UTC).strftime("%Y%m%d%H%M")
+
+
+class _CappedRetry(Retry):
+    """Retry that honours Retry-After but never sleeps longer than MAX_RETRY_AFTER seconds.
+
+    Requests are made from sync request handlers, so an unbounded wait would block a worker.
+    """
+
+    MAX_RETRY_AFTER = 5
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.MAX_RETRY_AFTER)
+
 
 class EntsoeAPIError(Exception):
     """Custom exception for ENTSO-E API errors."""
@@ -19,9 +93,18 @@ class EntsoeAPIError(Exception):
 class EntsoeClient:
     """Client for interacting with the ENTSO-E API."""
 
+    __slots__ = ("api_key", "session", "_cache", "_cache_lock")
+
     BASE_URL = "https://web-api.tp.entsoe.eu/api"
     FINLAND_DOMAIN = "10YFI-1--------U"
     VAT_RATE = 1.255  # 25.5% VAT
+    # Next day prices are published around noon CET, nothing further ahead can exist yet
+    PUBLICATION_HORIZON = timedelta(hours=36)
+    CONNECT_TIMEOUT = 5  # Seconds to establish the connection
+    READ_TIMEOUT = 30  # Seconds without receiving data before a request is considered stalled
+    CACHE_SIZE = 128
+    CACHE_TTL = 6 * 3600  # Seconds, for ranges that are fully in the past
+    RECENT_CACHE_TTL = 15 * 60  # Seconds, for ranges that can still get new prices
 
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("ENTSOE_API_KEY")
@@ -30,14 +113,49 @@ class EntsoeClient:
 
         # Configure session with retry logic
         self.session = requests.Session()
-        retry_strategy = Retry(
+        retry_strategy = _CappedRetry(
             total=3,
             backoff_factor=0.5,
-            status_forcelist=[500, 502, 503, 504],
+            status_forcelist=[429, 500, 502, 503, 504],
+        )
+        # The client is shared by the request threadpool, keep enough idle connections to
+        # the API host that concurrent requests reuse TLS sessions instead of reconnecting
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy,
+            pool_connections=1,  # Only one host is ever contacted
+            pool_maxsize=32,
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
         self.session.mount("https://", adapter)
 
+        # Parsed responses keyed by (start, end) epoch seconds, with their monotonic expiry time
+        self._cache: Dict[Tuple[int, int], Tuple[float, List[Dict]]] = {}
+        self._cache_lock = threading.Lock()
+
+    def _get_cached(self, key: Tuple[int, int]) -> Optional[List[Dict]]:
+        """Return a copy of the cached rows for a range, None if missing or expired."""
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                return None
+            expires_at, prices = cached
+            if expires_at <= time.monotonic():
+                del self._cache[key]
+                return None
+            return list(prices)
+
+    def _set_cached(self, key: Tuple[int, int], end_date: datetime, prices: List[Dict]) -> None:
+        """Cache parsed rows, briefly if the range reaches prices that may not be published yet."""
+        if end_date <= datetime.now(_UTC):
+            ttl = self.CACHE_TTL
+        else:
+            ttl = self.RECENT_CACHE_TTL
+
+        with self._cache_lock:
+            if key not in self._cache and len(self._cache) >= self.CACHE_SIZE:
+                # Evict the oldest entry
+                del self._cache[next(iter(self._cache))]
+            self._cache[key] = (time.monotonic() + ttl, prices)
+
     def _format_date(self, dt: datetime) -> str:
         """Format datetime for ENTSO-E API.
 
@@ -47,9 +165,7 @@ class EntsoeClient:
         Returns:
             Formatted string in YYYYMMDDHHMM format
         """
-        # Convert to UTC if not already
-        utc_dt = dt.astimezone(pytz.UTC)
-        return utc_dt.strftime("%Y%m%d%H%M")
+        return _format_timestamp(int(dt.timestamp()))
 
     def _get_request_params(self, start_date: datetime, end_date: datetime) -> Dict:
         """Prepare request parameters."""
@@ -62,74 +178,88 @@ class EntsoeClient:
             "securityToken": self.api_key,
         }
 
-    def _parse_xml_response(self, xml_content: str) -> List[Dict]:
-        """Parse XML response from ENTSO-E API."""
-        try:
-            root = ET.fromstring(xml_content)
-            namespace = {'ns': root.tag.split('}')[0].strip('{')}
-            prices = []
-
-            for timeseries in root.findall(".//ns:TimeSeries", namespace):
-                for period in timeseries.findall(".//ns:Period", namespace):
-                    prices.extend(self._parse_period(period, namespace))
+    def _parse_xml_response(self, xml_content: bytes) -> List[Dict]:
+        """Parse XML response from ENTSO-E API.
 
-            return prices
-        except ET.ParseError as e:
-            raise EntsoeAPIError(f"Failed to parse XML response: {str(e)}")
+        The document is streamed with iterparse, keeping only the current period start and
+        point values as state, instead of walking the tree with XPath lookups per point.
+        """
+        prices = []
+        start_ts = None
+        position = None
+        price_amount = None
 
-    def _parse_period(self, period: ET.Element, namespace: Dict) -> List[Dict]:
-        """Parse a single period from the XML response."""
         try:
-            start = period.find(".//ns:start", namespace).text
-            start_dt = datetime.strptime(start, "%Y-%m-%dT%H:%MZ").replace(tzinfo=pytz.utc)
-
-            prices = []
-            for point in period.findall(".//ns:Point", namespace):
-                price_data = self._parse_point(point, start_dt, namespace)
-                if price_data:
-                    prices.append(price_data)
+            for _, elem in ET.iterparse(io.BytesIO(xml_content), **_ITERPARSE_OPTIONS):
+                tag = _LOCAL_NAMES.get(elem.tag)
+                if tag is None:
+                    tag = _LOCAL_NAMES.setdefault(elem.tag, elem.tag.rpartition("}")[2])
+
+                if tag == "position":
+                    position = elem.text
+                elif tag == "price.amount":
+                    price_amount = elem.text
+                elif tag == "start":
+                    start_ts = _parse_start(elem.text)
+                elif tag == "Point":
+                    price_data = self._parse_point(position, price_amount, start_ts)
+                    if price_data:
+                        prices.append(price_data)
+                    position = price_amount = None
+                    elem.clear()
+                elif tag == "Period":
+                    start_ts = None
+                    elem.clear()
+                elif tag == "TimeSeries":
+                    # Drop the emptied periods too, only a bare element per series stays in the tree
+                    elem.clear()
 
             return prices
-        except (AttributeError, ValueError) as e:
-            return []
+        except ET.ParseError as e:
+            raise EntsoeAPIError(f"Failed to parse XML response: {str(e)}")
 
-    def _parse_point(self, point: ET.Element, start_dt: datetime, namespace: Dict) -> Optional[Dict]:
+    def _parse_point(
+            self,
+            position: Optional[str],
+            price_amount: Optional[str],
+            start_ts: Optional[int],
+    ) -> Optional[Dict]:
         """Parse a single price point from the XML response."""
-        try:
-            position = int(point.find("ns:position", namespace).text)
-            price_amount = point.find(".//ns:price.amount", namespace)
-            if price_amount is None:
-                return None
+        if start_ts is None or price_amount is None:
+            return None
 
-            price_mwh = float(price_amount.text)
+        try:
+            position = int(position)
+            price_mwh = float(price_amount)
+        except (ValueError, TypeError):
+            return None
 
-            # Convert MWh to cents/kWh and apply VAT
-            price_kwh = price_mwh / 1000
-            price_cents = price_kwh * 100 * self.VAT_RATE
+        timestamp = datetime.fromtimestamp(start_ts + (position - 1) * _POINT_SECONDS, tz=_UTC)
 
-            timestamp = start_dt + timedelta(hours=position - 1)
+        return {
+            "timestamp": timestamp,
+            # Convert MWh to cents/kWh and apply VAT, in this order so rounding matches stored rows
+            "price": round(price_mwh / 1000 * 100 * self.VAT_RATE, 2),  # Round to 2 decimal places
+        }
 
-            return {
-                "timestamp": timestamp,
-                "price": round(price_cents, 2),  # Round to 2 decimal places
-            }
-        except (ValueError, TypeError, AttributeError) as e:
-            return None
+    def get_published_until(self) -> datetime:
+        """Latest time ENTSO-E can have published prices for."""
+        return datetime.now(_UTC) + self.PUBLICATION_HORIZON
 
-    def get_electricity_price(
+    def get_electricity_price_data(
             self,
             start_date: datetime,
             end_date: datetime,
-    ) -> List[ElectricityPrice]:
+    ) -> List[Dict]:
         """
-        Fetch electricity prices from ENTSO-E API.
+        Fetch electricity prices from ENTSO-E API as plain rows.
 
         Args:
             start_date: Start datetime (timezone-aware)
             end_date: End datetime (timezone-aware)
 
         Returns:
-            List of ElectricityPrice objects
+            List of dicts with "timestamp" and "price" keys
 
         Raises:
             EntsoeAPIError: If API request fails
@@ -142,13 +272,18 @@ class EntsoeClient:
         if start_date > end_date:
             raise HTTPException(status_code=400, detail="Start date must be before end date")
 
+        cache_key = (int(start_date.timestamp()), int(end_date.timestamp()))
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+
         params = self._get_request_params(start_date, end_date)
 
         try:
             response = self.session.get(
                 self.BASE_URL,
                 params=params,
-                timeout=60
+                timeout=(self.CONNECT_TIMEOUT, self.READ_TIMEOUT),
             )
 
             if response.status_code == 401:
@@ -158,12 +293,35 @@ class EntsoeClient:
 
             response.raise_for_status()
 
-            prices = self._parse_xml_response(response.text)
-            return [ElectricityPrice(**price) for price in prices]
+            prices = self._parse_xml_response(response.content)
+            self._set_cached(cache_key, end_date, prices)
+            return list(prices)
 
         except requests.exceptions.RequestException as e:
             raise EntsoeAPIError(f"API request failed: {str(e)}")
 
+    def get_electricity_price(
+            self,
+            start_date: datetime,
+            end_date: datetime,
+    ) -> List[ElectricityPrice]:
+        """
+        Fetch electricity prices from ENTSO-E API.
+
+        Args:
+            start_date: Start datetime (timezone-aware)
+            end_date: End datetime (timezone-aware)
+
+        Returns:
+            List of ElectricityPrice objects
+
+        Raises:
+            EntsoeAPIError: If API request fails
+            HTTPException: If input validation fails
+        """
+        prices = self.get_electricity_price_data(start_date, end_date)
+        return [ElectricityPrice(**price) for price in prices]
+
 
 # Create a global client instance
 entsoe_client = EntsoeClient()
@@ -174,4 +332,17 @@ def get_electricity_price(
         end_date: datetime
 ) -> List[ElectricityPrice]:
     """Wrapper function for backward compatibility."""
-    return entsoe_client.get_electricity_price(start_date, end_date)
\ No newline at end of file
+    return entsoe_client.get_electricity_price(start_date, end_date)
+
+
+def get_electricity_price_data(
+        start_date: datetime,
+        end_date: datetime
+) -> List[Dict]:
+    """Fetch prices as plain rows, without building ElectricityPrice instances."""
+    return entsoe_client.get_electricity_price_data(start_date, end_date)
+
+
+def get_published_until() -> datetime:
+    """Latest time prices can be fetched for."""
+    return entsoe_client.get_published_until()